@@ -1,19 +1,41 @@
 # Market_Pulse.py — Market Pulse Bot (webhook, scheduled)
-import os, sys, time
-from datetime import datetime, timedelta, time as dtime
+import functools, json, math, os, sys, time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta, timezone, time as dtime
 from pathlib import Path
+from typing import NamedTuple
+from zoneinfo import ZoneInfo
 
 import requests
+from requests.adapters import HTTPAdapter
+import numpy as np
 import pandas as pd
+from pandas.tseries.holiday import (AbstractHolidayCalendar, GoodFriday, Holiday, USLaborDay,
+                                    USMartinLutherKingJr, USMemorialDay, USPresidentsDay,
+                                    USThanksgivingDay, nearest_workday, sunday_to_monday)
+from pandas.tseries.offsets import CustomBusinessDay
 import yfinance as yf
 import yaml
-import pytz
+from apscheduler.schedulers.blocking import BlockingScheduler
+from apscheduler.triggers.base import BaseTrigger
 from dotenv import load_dotenv
 
+try:
+    from numba import njit, prange
+except ImportError:  # optional; RSI falls back to the plain NumPy loop
+    njit, prange = None, range
+
 SCRIPT_NAME = os.path.basename(__file__)
 HERE = Path(__file__).parent
 ENV_PATH = HERE / ".env"
 CFG_PATH = HERE / "config.yaml"
+LOG_LEVEL = "INFO"  # set from log.level in main()
+
+# One pooled keep-alive session for the whole process (Discord webhook + Yahoo spark):
+# both hosts are fixed, so every request after the first reuses its TLS connection.
+SESSION = requests.Session()
+SESSION.mount("https://", HTTPAdapter(pool_connections=4, pool_maxsize=8))
 
 def ts(): return time.strftime("%Y-%m-%d %H:%M:%S")
 def banner():
@@ -39,91 +61,348 @@ def cfg(d, path, default=None):
     return cur
 
 def preview_df(df: pd.DataFrame, name: str, rows: int):
+    if df is not None: df = df.dropna(how="all")  # batched frames are padded to the union index
     if df is None or getattr(df, "empty", True):
         warn(f"{name}: empty dataframe"); return
+    # to_string() renders every previewed cell through pandas' formatter; debug only
+    if LOG_LEVEL != "DEBUG": return
     n = min(rows, len(df))
     info(f"{name}: rows={len(df)}; preview top {n}:")
     print(df.head(n).to_string())
 
-def compute_rsi(close: pd.Series, period: int = 14):
-    if close is None or close.empty or len(close) < period + 1: return None
-    delta = close.diff()
-    gain = delta.where(delta > 0, 0.0)
-    loss = -delta.where(delta < 0, 0.0)
-    avg_gain = gain.rolling(window=period).mean()
-    avg_loss = loss.rolling(window=period).mean()
-    rs = avg_gain / avg_loss
-    rsi = 100 - (100 / (1 + rs))
-    rsi = rsi.dropna()
-    return float(round(rsi.iloc[-1], 2)) if not rsi.empty else None
-
-def fetch_snapshot(ticker: str, preview_rows: int):
-    snap = {"ticker": ticker, "last": None, "chg_pct": None, "rsi": None}
+def _rsi_kernel(close, period):
+    # Returns -1.0 when RSI is undefined (no moves); kept NaN-free for fastmath.
+    d = np.diff(close)
+    gain = np.maximum(d, 0.0)  # branchless, no boolean mask
+    loss = np.maximum(-d, 0.0)
+    # Wilder's smoothing (RMA): seed with the first-period SMA, then recur
+    avg_g, avg_l = gain[:period].mean(), loss[:period].mean()
+    for i in range(period, d.shape[0]):
+        avg_g = (avg_g * (period - 1) + gain[i]) / period
+        avg_l = (avg_l * (period - 1) + loss[i]) / period
+    if avg_l == 0.0: return 100.0 if avg_g > 0.0 else -1.0
+    return 100.0 - (100.0 / (1.0 + avg_g / avg_l))
+
+def _rsi_rows(closes, period):
+    # closes: [N_tickers, N_bars], NaN-padded where a ticker has no bar
+    out = np.full(closes.shape[0], -1.0)
+    for i in prange(closes.shape[0]):
+        row = closes[i][~np.isnan(closes[i])]
+        if row.shape[0] >= period + 1: out[i] = _rsi_kernel(row, period)
+    return out
+
+def _tail_rows(closes):
+    # (prev, last) valid close per row; NaN when the row is too short
+    out = np.full((closes.shape[0], 2), np.nan)
+    for i in prange(closes.shape[0]):
+        row = closes[i][~np.isnan(closes[i])]
+        if row.shape[0] >= 1: out[i, 1] = row[-1]
+        if row.shape[0] >= 2: out[i, 0] = row[-2]
+    return out
+
+if njit is not None:
+    _rsi_kernel = njit(cache=True, fastmath=True)(_rsi_kernel)
+    # no fastmath on the row kernels: they rely on isnan to unpad
+    _rsi_rows   = njit(cache=True, parallel=True)(_rsi_rows)
+    _tail_rows  = njit(cache=True, parallel=True)(_tail_rows)
+    # compile once at import, not on the first tick
+    _rsi_rows(np.zeros((2, 20)), 14); _tail_rows(np.zeros((2, 20)))
+
+def dedupe_bars(close: pd.Series) -> pd.Series:
+    # Yahoo occasionally repeats a timestamp (e.g. the live bar); keep the latest print
+    return close[~close.index.duplicated(keep="last")]
+
+def stack_closes(closes: dict, tickers) -> np.ndarray:
+    """{ticker: Close series} -> C-contiguous float64 [N_tickers, N_bars] on the union index."""
+    closes = {t: dedupe_bars(closes[t]) for t in tickers if t in closes}
+    if not closes: return np.full((len(tickers), 0), np.nan)
+    frame = pd.DataFrame(closes).reindex(columns=list(tickers))
+    return np.ascontiguousarray(frame.to_numpy(dtype=np.float64).T)
+
+YF_BATCH = 20  # Yahoo rejects more symbols than this per batched request
+YF_WORKERS = 8
+
+def split_closes(df: pd.DataFrame, tickers, label: str, preview_rows: int):
+    """Slice a group_by='ticker' download into {ticker: Close series}."""
+    closes = {}
+    if df is None or df.empty: return closes
+    for t in tickers:
+        try:
+            sub = df[t] if isinstance(df.columns, pd.MultiIndex) else df
+        except KeyError:
+            warn(f"{t} {label}: missing from batch"); continue
+        preview_df(sub, f"{t} {label}", preview_rows)
+        close = dedupe_bars(sub["Close"].dropna())
+        if not close.empty: closes[t] = close
+    return closes
+
+SPARK_URL = "https://query1.finance.yahoo.com/v8/finance/spark"
+SPARK_HEADERS = {"User-Agent": "Mozilla/5.0"}  # Yahoo throttles the default python-requests UA
+
+def fetch_spark(symbols, range_: str, interval: str) -> dict[str, pd.Series]:
+    """Close-only bars from Yahoo's spark endpoint: {symbol: Close series} (≤ YF_BATCH symbols)."""
+    params = {"symbols": ",".join(symbols[:YF_BATCH]), "range": range_,
+              "interval": interval, "indicators": "close"}
+    r = SESSION.get(SPARK_URL, params=params, headers=SPARK_HEADERS, timeout=30)
+    r.raise_for_status()
+    closes = {}
+    for res in r.json()["spark"]["result"]:
+        resp = (res.get("response") or [{}])[0]
+        if not resp.get("timestamp"): continue
+        tz = (resp.get("meta") or {}).get("exchangeTimezoneName", "America/New_York")
+        idx = pd.to_datetime(resp["timestamp"], unit="s", utc=True).tz_convert(tz)
+        close = np.asarray(resp["indicators"]["quote"][0]["close"], dtype=np.float64)  # null -> NaN
+        series = dedupe_bars(pd.Series(close, index=idx, name="Close").dropna())
+        if not series.empty: closes[res["symbol"]] = series
+    return closes
+
+def spark_range(start) -> str:
+    # spark takes a range, not a start. Intraday "1d" means the latest session, not the last
+    # 24h, so it only covers start when start is in today's session (exchange time).
+    start_day, today = start.astimezone(ET).date(), datetime.now(ET).date()
+    if start_day == today: return "1d"
+    return "5d" if today - start_day < timedelta(days=5) else "1mo"
+
+def download_batch(batch, interval: str, preview_rows: int, **span):
+    # span is yf.download's period=... or start=...
+    range_ = span.get("period") or spark_range(span["start"])
+    info(f"[API] spark({','.join(batch)}, range='{range_}', interval='{interval}')")
+    closes = {}
+    try:
+        closes = fetch_spark(batch, range_, interval)
+        for t, close in closes.items():
+            preview_df(close.to_frame(), f"{t} {interval} ({range_})", preview_rows)
+    except Exception as e:
+        warn(f"{', '.join(batch)} spark fetch failed ({e}); falling back to yfinance")
+    missing = [t for t in batch if t not in closes]
+    if not missing: return closes
+    if len(missing) < len(batch):
+        warn(f"{', '.join(missing)} missing from spark response; falling back to yfinance")
+
+    desc = ", ".join(f"{k}='{v}'" for k, v in span.items())
+    info(f"[API] yfinance.download({' '.join(missing)}, {desc}, interval='{interval}')")
     try:
-        info(f"[API] yfinance.download({ticker}, period='1d', interval='1m')")
-        df_1m = yf.download(ticker, period="1d", interval="1m", progress=False)
-        preview_df(df_1m, f"{ticker} 1m (today)", preview_rows)
-        if df_1m is not None and not df_1m.empty:
-            last_close = df_1m["Close"].iloc[-1]
-            snap["last"] = float(round(last_close, 2))
-            if len(df_1m) > 1:
-                prev = df_1m["Close"].iloc[-2]
-                if prev and prev != 0:
-                    snap["chg_pct"] = float(round((last_close - prev) / prev * 100.0, 2))
-
-        info(f"[API] yfinance.download({ticker}, period='7d', interval='15m') for RSI")
-        df_15m = yf.download(ticker, period="7d", interval="15m", progress=False)
-        preview_df(df_15m, f"{ticker} 15m (7d)", preview_rows)
-        if df_15m is not None and not df_15m.empty:
-            snap["rsi"] = compute_rsi(df_15m["Close"])
+        # auto_adjust=False: Close is used as-is, so skip the OHLC rescaling pass
+        df = yf.download(" ".join(missing), interval=interval, group_by="ticker", auto_adjust=False,
+                         threads=True, progress=False, **span)
     except Exception as e:
-        err(f"{ticker} fetch error: {e}")
-    info(f"{ticker} summary: last={snap.get('last')} | Δ%={snap.get('chg_pct')} | RSI={snap.get('rsi')}")
-    return snap
-
-def build_message(snaps):
-    lines = []
-    lines.append("📊 **Market Pulse Bot — Snapshot**")
-    lines.append(f"_Generated at {datetime.now().strftime('%Y-%m-%d %H:%M:%S')} local_")
-    lines.append("")
-    lines.append("```")
-    lines.append(f"{'Ticker':<8} {'Last':>9} {'Δ%':>7} {'RSI(14)':>8}")
-    lines.append("-" * 34)
+        err(f"{', '.join(missing)} {interval} fetch error: {e}"); return closes
+    closes.update(split_closes(df, missing, f"{interval} ({desc})", preview_rows))
+    return closes
+
+def download_closes(tickers, interval: str, preview_rows: int, **span):
+    batches = [tickers[i:i + YF_BATCH] for i in range(0, len(tickers), YF_BATCH)]
+    closes = {}
+    if not batches: return closes
+    # I/O-bound: threads overlap the HTTP waits; map keeps batch order
+    with ThreadPoolExecutor(max_workers=min(YF_WORKERS, len(batches))) as ex:
+        for part in ex.map(lambda b: download_batch(b, interval, preview_rows, **span), batches):
+            closes.update(part)
+    return closes
+
+# ---- 15m history cache (RSI input) ----
+HIST_SESSIONS = 5  # same window whether pulled fresh ("5d") or grown tick by tick
+HIST_BAR    = "15min"  # bars open on :00/:15/:30/:45, so an entry is fresh only within one bar
+_HIST_CACHE: dict[str, tuple[datetime, pd.Series]] = {}
+
+def history_15m(tickers, preview_rows: int):
+    """HIST_SESSIONS sessions of 15m closes per ticker; cached between ticks, topped up with only the new bars."""
+    now = datetime.now(timezone.utc)
+    bar = pd.Timestamp(now).floor(HIST_BAR)
+    # stale once a new bar boundary has passed since the fetch, however few minutes ago that was
+    stale = [t for t in tickers if t in _HIST_CACHE and pd.Timestamp(_HIST_CACHE[t][0]).floor(HIST_BAR) < bar]
+    missing = [t for t in tickers if t not in _HIST_CACHE]
+
+    fetched = download_closes(missing, "15m", preview_rows, period=f"{HIST_SESSIONS}d")
+    if stale:
+        # re-pull from the oldest last bar so a partial bar gets its final close
+        start = min(_HIST_CACHE[t][1].index[-1] for t in stale)
+        for t, new in download_closes(stale, "15m", preview_rows, start=start).items():
+            old = _HIST_CACHE[t][1]
+            merged = pd.concat([old, new])
+            merged = merged[~merged.index.duplicated(keep="last")].sort_index()
+            sessions = merged.index.normalize().unique()
+            fetched[t] = merged[merged.index >= sessions[-HIST_SESSIONS:][0]]
+    for t, close in fetched.items():
+        _HIST_CACHE[t] = (now, close)
+    # a failed top-up keeps its cache entry for next tick, but must not be posted as current
+    failed = [t for t in stale if t not in fetched]
+    if failed: warn(f"{', '.join(failed)}: 15m top-up failed; not reusing cached bars (shown as n/a)")
+    return {t: _HIST_CACHE[t][1] for t in tickers if t in _HIST_CACHE and t not in failed}
+
+def _snapshot_arrays(tickers, closes_last: dict, closes_15m: dict, period: int):
+    # One pass over all tickers at once (rows = tickers) instead of per-ticker Series math
+    tails = _tail_rows(stack_closes(closes_last, tickers))
+    rsi = _rsi_rows(stack_closes(closes_15m, tickers), period)
+    prev, last = tails[:, 0], tails[:, 1]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        chg = np.where(prev != 0, (last - prev) / prev * 100.0, np.nan)
+    return np.round(last, 2), np.round(chg, 2), np.round(rsi, 2)
+
+def compute_snapshots(tickers, closes_last: dict, closes_15m: dict, period: int = 14):
+    # closes_last: series "last"/Δ% are read from (15m by default, 1m when high_res_last)
+    snaps = [{"ticker": t, "last": None, "chg_pct": None, "rsi": None} for t in tickers]
+    try:
+        rows = zip(snaps, *_snapshot_arrays(tickers, closes_last, closes_15m, period))
+    except Exception as e:
+        # keep a bad ticker from blanking the whole post: redo each row on its own
+        warn(f"batched snapshot failed ({e}); computing per ticker")
+        rows = []
+        for snap in snaps:
+            try:
+                rows.append((snap, *(a[0] for a in _snapshot_arrays([snap["ticker"]], closes_last, closes_15m, period))))
+            except Exception as e:
+                err(f"{snap['ticker']} snapshot error: {e}")
+    for snap, l, c, r in rows:
+        if not np.isnan(l): snap["last"] = float(l)
+        if not np.isnan(c): snap["chg_pct"] = float(c)
+        if r >= 0: snap["rsi"] = float(r)
     for s in snaps:
-        last = f"{s.get('last'):.2f}" if isinstance(s.get('last'), (int, float)) else "n/a"
-        chg  = f"{s.get('chg_pct'):.2f}" if isinstance(s.get('chg_pct'), (int, float)) else "n/a"
-        rsi  = f"{s.get('rsi'):.2f}" if isinstance(s.get('rsi'), (int, float)) else "n/a"
-        lines.append(f"{s['ticker']:<8} {last:>9} {chg:>7} {rsi:>8}")
-    lines.append("```")
-    return "\n".join(lines)
+        info(f"{s['ticker']} summary: last={s.get('last')} | Δ%={s.get('chg_pct')} | RSI={s.get('rsi')}")
+    return snaps
+
+ROW_FMT = "{ticker:<8} {last:>9} {chg:>7} {rsi:>8}"
+ROW_HEADER = ROW_FMT.format(ticker="Ticker", last="Last", chg="Δ%", rsi="RSI(14)")
+
+def _fmt2(v): return f"{v:.2f}" if v is not None and not math.isnan(v) else "n/a"
+
+MSG_FMT = ("📊 **Market Pulse Bot — Snapshot**\n"
+           "_Generated at {generated} local_\n\n"
+           "```\n" + ROW_HEADER + "\n" + "-" * 34 + "\n{rows}\n```")
+
+def build_message(snaps, generated: str):
+    rows = "\n".join(ROW_FMT.format(ticker=s["ticker"], last=_fmt2(s.get("last")),
+                                    chg=_fmt2(s.get("chg_pct")), rsi=_fmt2(s.get("rsi"))) for s in snaps)
+    return MSG_FMT.format(generated=generated, rows=rows)
 
 def post_discord(webhook: str, content: str) -> bool:
     try:
-        r = requests.post(webhook, json={"content": content}, timeout=30)
+        # compact separators + raw UTF-8 (emoji/Δ would otherwise be \uXXXX-escaped)
+        body = json.dumps({"content": content}, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+        r = SESSION.post(webhook, data=body, headers={"Content-Type": "application/json"}, timeout=30)
         if 200 <= r.status_code < 300:
             info("✅ Posted to Discord successfully."); return True
         err(f"Discord webhook error {r.status_code}: {r.text}"); return False
     except Exception as e:
         err(f"Discord webhook exception: {e}"); return False
 
-def run_once(tickers, webhook, preview_rows):
-    snaps = [fetch_snapshot(t, preview_rows) for t in tickers]
-    msg = build_message(snaps)
+def run_once(tickers, webhook, preview_rows, high_res_last=False):
+    # Batched requests (per YF_BATCH symbols); the 1m pull is only needed for a tighter "last"
+    with ThreadPoolExecutor(max_workers=2) as ex:
+        f_15m = ex.submit(history_15m, tickers, preview_rows)
+        f_1m  = ex.submit(download_closes, tickers, "1m", preview_rows, period="1d") if high_res_last else None
+        closes_15m = f_15m.result()
+        closes_last = f_1m.result() if f_1m else closes_15m
+    snaps = compute_snapshots(tickers, closes_last, closes_15m)
+    msg = build_message(snaps, datetime.now().strftime('%Y-%m-%d %H:%M:%S'))
     ok = post_discord(webhook, msg)
     if not ok: err("Failed to post snapshot.")
 
 # ---- Scheduler (US/Eastern market hours) ----
-def minutes_since_open(now_et: datetime, open_t: dtime) -> float:
-    mo = now_et.replace(hour=open_t.hour, minute=open_t.minute, second=0, microsecond=0)
-    return (now_et - mo).total_seconds() / 60.0
+ET = ZoneInfo("US/Eastern")
+
+class NYSEHolidayCalendar(AbstractHolidayCalendar):
+    # Exchange holidays, not federal ones: Good Friday closes, Columbus/Veterans Day don't
+    rules = [
+        Holiday("New Year's Day", month=1, day=1, observance=sunday_to_monday),
+        USMartinLutherKingJr, USPresidentsDay, GoodFriday, USMemorialDay,
+        Holiday("Juneteenth", month=6, day=19, start_date="2022-06-19", observance=nearest_workday),
+        Holiday("Independence Day", month=7, day=4, observance=nearest_workday),
+        USLaborDay, USThanksgivingDay,
+        Holiday("Christmas Day", month=12, day=25, observance=nearest_workday),
+    ]
 
-def sleep_until(seconds: float):
-    # tiny helper to keep logs readable during long sleeps
-    mins = int(max(0, seconds) // 60)
-    info(f"[SCHED] Sleeping ~{mins} min.")
-    time.sleep(max(1.0, seconds))
+TRADING_DAY = CustomBusinessDay(calendar=NYSEHolidayCalendar())
+
+class Schedule(NamedTuple):
+    market_open: dtime
+    market_close: dtime
+    early_int: int
+    early_dur: int
+    later_int: int
+
+# Per-date results are cached: every tick (and every APScheduler wake-up) asks about the
+# same handful of dates, and sched is a hashable NamedTuple.
+@functools.lru_cache(maxsize=16)
+def is_trading_day(d: date) -> bool:
+    return TRADING_DAY.is_on_offset(pd.Timestamp(d))
+
+@functools.lru_cache(maxsize=8)
+def market_window(d: date, sched: Schedule) -> tuple[datetime, datetime]:
+    """Localized (open, close) for one date; zoneinfo resolves the DST offset per date."""
+    return (datetime.combine(d, sched.market_open, tzinfo=ET),
+            datetime.combine(d, sched.market_close, tzinfo=ET))
+
+@functools.lru_cache(maxsize=8)
+def session_slots(d: date, sched: Schedule) -> tuple[datetime, ...]:
+    """Tick times for one session: every early_int min for early_dur min after open, then later_int."""
+    open_dt, close_dt = market_window(d, sched)
+    slots, slot = [], open_dt
+    while slot <= close_dt:
+        slots.append(slot)
+        mins_open = (slot - open_dt).total_seconds() / 60.0
+        slot += timedelta(minutes=sched.early_int if mins_open <= sched.early_dur else sched.later_int)
+    return tuple(slots)
+
+def is_market_open(now_et: datetime, sched: Schedule) -> bool:
+    if not is_trading_day(now_et.date()): return False
+    open_dt, close_dt = market_window(now_et.date(), sched)
+    return open_dt <= now_et <= close_dt
+
+def compute_next_run(now_et: datetime, sched: Schedule) -> datetime:
+    """First scheduled tick strictly after now_et, skipping weekends and exchange holidays."""
+    d = now_et.date()
+    while True:
+        if is_trading_day(d):
+            for slot in session_slots(d, sched):
+                if slot > now_et: return slot
+        d += timedelta(days=1)
+
+class SessionTrigger(BaseTrigger):
+    """APScheduler trigger that fires on compute_next_run() slots (DST- and holiday-aware)."""
+    def __init__(self, sched: Schedule): self.sched = sched
+    def get_next_fire_time(self, previous_fire_time, now):
+        return compute_next_run(previous_fire_time or now, self.sched)
+    def __str__(self): return f"session[{self.sched.market_open:%H:%M}-{self.sched.market_close:%H:%M} ET]"
+
+def minutes_since_open(now_et: datetime, sched: Schedule) -> float:
+    return (now_et - market_window(now_et.date(), sched)[0]).total_seconds() / 60.0
+
+# ---- Config (flattened once at startup) ----
+@dataclass(frozen=True)
+class Config:
+    tickers: tuple
+    log_level: str
+    sample_rows: int
+    high_res_last: bool
+    schedule: Schedule
+
+    @classmethod
+    def from_dict(cls, d: dict, env_tickers: str = "") -> "Config":
+        # Tickers: env overrides config.yaml
+        env_tickers = env_tickers.strip()
+        if env_tickers:
+            tickers = [t.strip().upper() for t in env_tickers.split(",") if t.strip()]
+        else:
+            tickers = cfg(d, "market.tickers", ["SPY","QQQ","DIA"])
+        open_h, open_m   = map(int, cfg(d, "market.market_open", "09:30").split(":"))
+        close_h, close_m = map(int, cfg(d, "market.market_close", "16:00").split(":"))
+        return cls(
+            tickers       = tuple(tickers),
+            log_level     = (cfg(d, "log.level", "INFO") or "INFO").upper(),
+            sample_rows   = int(cfg(d, "log.sample_rows", 3)),
+            high_res_last = bool(cfg(d, "market.high_res_last", False)),
+            schedule      = Schedule(
+                market_open  = dtime(open_h, open_m),
+                market_close = dtime(close_h, close_m),
+                early_int    = int(cfg(d, "market.update_schedule.early_interval_minutes", 30)),
+                early_dur    = int(cfg(d, "market.update_schedule.early_duration_minutes", 150)),
+                later_int    = int(cfg(d, "market.update_schedule.later_interval_minutes", 60)),
+            ),
+        )
 
 def main():
+    global LOG_LEVEL
     banner()
     # Load env & config
     info(f"Loading .env from: {ENV_PATH}")
@@ -134,61 +413,32 @@ def main():
     if not webhook:
         err("DISCORD_WEBHOOK_URL not set in .env"); sys.exit(1)
 
-    # Tickers: env overrides config.yaml
-    env_tickers = os.getenv("TICKERS", "").strip()
-    if env_tickers:
-        tickers = [t.strip().upper() for t in env_tickers.split(",") if t.strip()]
-    else:
-        tickers = cfg(cfg_all, "market.tickers", ["SPY","QQQ","DIA"])
-
-    log_level  = (cfg(cfg_all, "log.level", "INFO") or "INFO").upper()
-    sample_rows= int(cfg(cfg_all, "log.sample_rows", 3))
-    early_int  = int(cfg(cfg_all, "market.update_schedule.early_interval_minutes", 30))
-    early_dur  = int(cfg(cfg_all, "market.update_schedule.early_duration_minutes", 150))
-    later_int  = int(cfg(cfg_all, "market.update_schedule.later_interval_minutes", 60))
-    open_str   = cfg(cfg_all, "market.market_open", "09:30")
-    close_str  = cfg(cfg_all, "market.market_close", "16:00")
-
-    info(f"Tickers: {', '.join(tickers)}")
-    info(f"Schedule: every {early_int}m for first {early_dur}m after open, then every {later_int}m until close")
-    info(f"Market hours (ET): {open_str}–{close_str}")
-
-    # Timezones
-    ET = pytz.timezone("US/Eastern")
-    open_h, open_m   = map(int, open_str.split(":"))
-    close_h, close_m = map(int, close_str.split(":"))
-    MARKET_OPEN  = dtime(open_h, open_m)
-    MARKET_CLOSE = dtime(close_h, close_m)
-
-    # Main loop
-    while True:
+    conf = Config.from_dict(cfg_all, os.getenv("TICKERS", ""))
+    LOG_LEVEL = conf.log_level
+    sched = conf.schedule
+
+    info(f"Tickers: {', '.join(conf.tickers)}")
+    info(f"Schedule: every {sched.early_int}m for first {sched.early_dur}m after open, then every {sched.later_int}m until close")
+    info(f"Market hours (ET): {sched.market_open:%H:%M}–{sched.market_close:%H:%M}")
+    info(f"Last price from: {'1m bars' if conf.high_res_last else '15m bars'}")
+
+    def tick():
         now_et = datetime.now(ET)
-        today_open  = now_et.replace(hour=MARKET_OPEN.hour, minute=MARKET_OPEN.minute, second=0, microsecond=0)
-        today_close = now_et.replace(hour=MARKET_CLOSE.hour, minute=MARKET_CLOSE.minute, second=0, microsecond=0)
-
-        # If within market hours: run and then sleep for the correct interval
-        if today_open.time() <= now_et.time() <= today_close.time():
-            mins_open = minutes_since_open(now_et, MARKET_OPEN)
-            interval  = early_int if mins_open <= early_dur else later_int
-            info(f"[SCHED] Tick @ {now_et.strftime('%Y-%m-%d %H:%M %Z')} (mins since open: {int(mins_open)}) → next in {interval} min")
-            run_once(tickers, webhook, sample_rows)
-            time.sleep(interval * 60)
-            continue
-
-        # Outside market hours: sleep until next open
-        if now_et.time() > today_close.time():
-            # After close → next open tomorrow (skip weekends)
-            next_day = now_et + timedelta(days=1)
-            while next_day.weekday() >= 5:  # 5=Sat, 6=Sun
-                next_day += timedelta(days=1)
-            next_open = next_day.replace(hour=MARKET_OPEN.hour, minute=MARKET_OPEN.minute, second=0, microsecond=0, tzinfo=ET)
-        else:
-            # Before open today
-            next_open = today_open
+        info(f"[SCHED] Tick @ {now_et.strftime('%Y-%m-%d %H:%M %Z')} (mins since open: {int(minutes_since_open(now_et, sched))})")
+        run_once(conf.tickers, webhook, conf.sample_rows, conf.high_res_last)
+        info(f"[SCHED] Next run: {compute_next_run(datetime.now(ET), sched).strftime('%Y-%m-%d %H:%M %Z')}")
 
-        sleep_secs = (next_open - now_et).total_seconds()
-        info(f"[SCHED] Market closed. Next open: {next_open.strftime('%Y-%m-%d %H:%M %Z')}")
-        sleep_until(sleep_secs)
+    scheduler = BlockingScheduler(timezone=ET)
+    now_et = datetime.now(ET)
+    # Started mid-session: post right away instead of waiting for the next slot
+    first = {"next_run_time": now_et} if is_market_open(now_et, sched) else {}
+    scheduler.add_job(tick, SessionTrigger(sched), coalesce=True, misfire_grace_time=60, **first)
+    if not first:
+        info(f"[SCHED] Market closed. Next open: {compute_next_run(now_et, sched).strftime('%Y-%m-%d %H:%M %Z')}")
+    try:
+        scheduler.start()  # blocks; wakes only for scheduled ticks
+    except (KeyboardInterrupt, SystemExit):
+        info("[SCHED] Stopped.")
 
 if __name__ == "__main__":
     main()